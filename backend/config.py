@@ -1,5 +1,12 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from dotenv import load_dotenv
+from functools import cached_property, lru_cache
+from typing import FrozenSet
+
+# Load .env into the process environment once at import; Settings then
+# reads plain environment variables instead of re-opening the file.
+# Variables already set in the environment take precedence.
+load_dotenv(".env", override=False)
 
 
 class Settings(BaseSettings):
@@ -7,8 +14,19 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./test.db"  # Default for testing
-    DB_POOL_SIZE: int = 2
-    DB_MAX_OVERFLOW: int = 5
+    # Size the pools for (workers x expected concurrent requests per worker).
+    # The sync engine (task routes) and the async engine (chat) each have their
+    # own pool, so keep the sum of both pool sizes and overflows per worker
+    # below the DB connection cap
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_ASYNC_POOL_SIZE: int = 5
+    DB_ASYNC_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: int = 5  # Seconds to wait for a pooled connection
+    DB_POOL_RECYCLE: int = 300  # Recycle connections before the DB idle timeout
+    DB_PRE_PING: bool = False  # Ping on checkout (only needed for HA failover setups)
+    SERVERLESS: bool = False  # Use a minimal per-instance pool (e.g. Vercel)
+    DB_PGBOUNCER: bool = False  # Behind PgBouncer transaction pooling: no app-side pool
     
     # Authentication
     BETTER_AUTH_SECRET: str = "default-secret-key-change-in-production-min-32-chars-long"
@@ -23,16 +41,27 @@ class Settings(BaseSettings):
     
     # AI Service
     GOOGLE_API_KEY: str = ""
+    GEMINI_MAX_CONCURRENCY: int = 8  # Gemini calls in flight per process
+    GEMINI_TIMEOUT: float = 15  # Seconds to wait for each Gemini response
     
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Parse CORS origins string into list."""
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+    @cached_property
+    def cors_origins_list(self) -> FrozenSet[str]:
+        """Parse CORS origins string into a set (computed once)."""
+        return frozenset(
+            origin.strip().rstrip("/")
+            for origin in self.CORS_ORIGINS.split(",")
+            if origin.strip()
+        )
     
     class Config:
-        env_file = ".env"
         case_sensitive = False
         extra = "ignore"  # Allow extra environment variables
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the application settings, parsed once per process."""
+    return Settings()
+
+
+settings = get_settings()
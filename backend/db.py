@@ -1,25 +1,118 @@
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from config import settings
 import logging
+from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 
+
+def get_pool_options(pool_size: int, max_overflow: int):
+    """
+    Build the pool arguments for an engine.
+    
+    Args:
+        pool_size: Connections kept open by the engine
+        max_overflow: Extra connections allowed under load
+        
+    Returns:
+        Keyword arguments for create_engine/create_async_engine
+    """
+    # Behind PgBouncer in transaction mode the bouncer already pools server
+    # connections, so hold none here (and skip pre-ping) to avoid stacking pools
+    if settings.DB_PGBOUNCER:
+        return {"poolclass": NullPool}
+    
+    # Each serverless instance handles one request at a time, so it only
+    # needs a single connection of its own
+    if settings.SERVERLESS:
+        pool_size, max_overflow = 1, 0
+    
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_PRE_PING,  # Test connections before using
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # Recycle before the DB idle timeout
+    }
+
+
+# The sync and async engines each size their own pool, so together they
+# stay within the per-process connection budget
+pool_options = get_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+async_pool_options = get_pool_options(settings.DB_ASYNC_POOL_SIZE, settings.DB_ASYNC_MAX_OVERFLOW)
+
 # Create database engine with connection pooling
 try:
     engine = create_engine(
         settings.DATABASE_URL,
-        pool_size=settings.DB_POOL_SIZE,
-        max_overflow=settings.DB_MAX_OVERFLOW,
-        pool_pre_ping=True,  # Test connections before using
-        pool_recycle=3600,   # Recycle connections after 1 hour
+        **pool_options,
         echo=settings.DEBUG,  # Log SQL queries in debug mode
     )
     logger.info("Database engine created successfully")
 except Exception as e:
-    logger.error(f"Failed to create database engine: {e}")
+    logger.error("Failed to create database engine: %s", e)
     engine = None
 
 
+# Async driver for each sync database URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str):
+    """
+    Convert a database URL to use the matching async driver.
+    asyncpg does not accept libpq's sslmode/channel_binding query
+    parameters, so sslmode is passed through connect_args instead.
+    
+    Returns:
+        Tuple of (async URL, connect_args)
+    """
+    url = make_url(database_url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    query = dict(url.query)
+    connect_args = {}
+    
+    if drivername == "postgresql+asyncpg":
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        if settings.DB_PGBOUNCER:
+            # Prepared statements don't survive transaction pooling, since
+            # consecutive transactions may run on different server connections.
+            # Disable asyncpg's and the dialect's statement caches, and give
+            # every statement the dialect still prepares a unique name so
+            # asyncpg's per-connection numbering can't collide on the server
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+            query["prepared_statement_cache_size"] = "0"
+    
+    return url.set(drivername=drivername, query=query), connect_args
+
+
+# Create async database engine (used by the chat routes and AI service)
+try:
+    async_url, async_connect_args = get_async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(
+        async_url,
+        connect_args=async_connect_args,
+        **async_pool_options,
+        echo=settings.DEBUG,
+    )
+    logger.info("Async database engine created successfully")
+except Exception as e:
+    logger.error("Failed to create async database engine: %s", e)
+    async_engine = None
+
+
 def create_db_and_tables():
     """Create all database tables."""
     if engine is None:
@@ -30,10 +123,31 @@ def create_db_and_tables():
         SQLModel.metadata.create_all(engine)
         logger.info("Database tables created successfully")
     except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
+        logger.error("Error creating database tables: %s", e)
         # Don't raise in serverless environment
 
 
+def prime_connection_pool():
+    """
+    Open pool_size connections up front so the first requests
+    don't pay the connect/TLS handshake cost.
+    """
+    if engine is None:
+        return
+    
+    connections = []
+    try:
+        for _ in range(pool_options.get("pool_size", 0)):
+            connections.append(engine.connect())
+        logger.info("Primed connection pool with %d connections", len(connections))
+    except Exception as e:
+        logger.warning("Connection pool priming failed: %s", e)
+    finally:
+        # Return the connections to the pool
+        for conn in connections:
+            conn.close()
+
+
 def get_session():
     """
     Dependency for database session.
@@ -44,3 +158,15 @@ def get_session():
     
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    """
+    Dependency for async database session.
+    Yields a session and ensures it's closed after use.
+    """
+    if async_engine is None:
+        raise RuntimeError("Async database engine not available")
+    
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
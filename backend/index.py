@@ -1,5 +1,10 @@
 from mangum import Mangum
 from main import app
+from db import create_db_and_tables
+
+# Lifespan is off under Mangum (it would run on every invocation), so
+# initialize database tables here, once per cold start
+create_db_and_tables()
 
 # Vercel serverless function handler using Mangum
 handler = Mangum(app, lifespan="off")
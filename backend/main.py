@@ -1,9 +1,12 @@
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from config import settings
-from db import create_db_and_tables
+from db import async_engine, create_db_and_tables, prime_connection_pool
+from middleware.cors import CORSMiddleware
 from routes import health, tasks, auth, chat
 
 # Configure logging
@@ -13,17 +16,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Outside debug mode, raise the level of the noisiest loggers so their
+# records are dropped by the cheap level check before any formatting
+if not settings.DEBUG:
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    logging.getLogger("sqlalchemy.pool").setLevel(logging.WARNING)
+    logging.getLogger("mcp_tools.task_operations").setLevel(logging.WARNING)
+    logging.getLogger("routes.tasks").setLevel(logging.WARNING)
+    logging.getLogger("services.ai_service").setLevel(logging.WARNING)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown."""
+    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    
+    # Create tables and warm up the connection pool in parallel
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(asyncio.to_thread(create_db_and_tables))
+        tg.create_task(asyncio.to_thread(prime_connection_pool))
+    logger.info("Database initialization complete")
+    
+    yield
+    
+    if async_engine is not None:
+        await async_engine.dispose()
+    logger.info("Application shutdown")
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="RESTful API for Todo application with JWT authentication",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# CORS middleware
-# Allow all origins or specific origins from config
+# CORS middleware (pure ASGI, see middleware/cors.py)
+# Allow all origins or specific origins from config. Browsers reject a
+# wildcard origin on credentialed requests, and the API authenticates with
+# a Bearer header rather than cookies, so credentials are only enabled for
+# explicit origins; this keeps the wildcard case on the fixed-header path.
 if settings.CORS_ORIGINS == "*":
     cors_origins = ["*"]
 else:
@@ -32,7 +68,7 @@ else:
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
-    allow_credentials=True,
+    allow_credentials=cors_origins != ["*"],
     allow_methods=["*"],
     allow_headers=["*"],
     expose_headers=["*"],
@@ -44,27 +80,6 @@ app.include_router(auth.router, prefix="/api")
 app.include_router(tasks.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")  # Phase III: AI Chat
 
-# Initialize database tables on module import (for serverless)
-# This runs once when the function cold-starts
-try:
-    create_db_and_tables()
-    logger.info("Database initialization complete")
-except Exception as e:
-    logger.warning(f"Database initialization skipped or failed: {e}")
-
-
-@app.on_event("startup")
-def on_startup():
-    """Application startup hook."""
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-
-
-@app.on_event("shutdown")
-def on_shutdown():
-    """Cleanup on shutdown."""
-    logger.info("Application shutdown")
-
-
 @app.get("/")
 def root():
     """Root endpoint."""
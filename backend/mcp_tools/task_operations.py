@@ -2,17 +2,54 @@
 Task Operations
 Simple functions for task management operations.
 """
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import update, delete
 from typing import Optional, List, Dict, Any
+import functools
 import logging
 
 from models import Task
-from db import engine
 
 logger = logging.getLogger(__name__)
 
+# Extra WHERE clause for each list_tasks status ("all" has none)
+_STATUS_FILTER = {
+    "pending": Task.completed.is_(False),
+    "completed": Task.completed.is_(True),
+}
 
+
+def _db_error_boundary(action: str, wrap_in_list: bool = False):
+    """
+    Decorator that turns any exception raised by a task operation into
+    the standard DATABASE_ERROR response and rolls back the session.
+    
+    Args:
+        action: Description used in the error message (e.g. "create task")
+        wrap_in_list: Return the error inside a list (for list operations)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(session: AsyncSession, *args, **kwargs):
+            try:
+                return await func(session, *args, **kwargs)
+            except Exception as e:
+                logger.error("Failed to %s: %s", action, e)
+                await session.rollback()
+                error = {
+                    "error": True,
+                    "message": f"Failed to {action}: {str(e)}",
+                    "code": "DATABASE_ERROR"
+                }
+                return [error] if wrap_in_list else error
+        return wrapper
+    return decorator
+
+
+@_db_error_boundary("create task")
 async def add_task(
+    session: AsyncSession,
     user_id: str,
     title: str,
     description: Optional[str] = None
@@ -21,6 +58,7 @@ async def add_task(
     Create a new task.
     
     Args:
+        session: Database session
         user_id: ID of the user creating the task
         title: Task title (required)
         description: Task description (optional)
@@ -28,91 +66,89 @@ async def add_task(
     Returns:
         Dictionary with task_id, status, and title
     """
-    try:
-        with Session(engine) as session:
-            # Create new task
-            task = Task(
-                user_id=user_id,
-                title=title,
-                description=description,
-                completed=False
-            )
-            
-            session.add(task)
-            session.commit()
-            session.refresh(task)
-            
-            logger.info(f"Created task {task.id} for user {user_id}: {title}")
-            
-            return {
-                "task_id": task.id,
-                "status": "created",
-                "title": task.title
-            }
-            
-    except Exception as e:
-        logger.error(f"Error creating task: {e}")
-        return {
-            "error": True,
-            "message": f"Failed to create task: {str(e)}",
-            "code": "DATABASE_ERROR"
-        }
+    # Create new task
+    task = Task(
+        user_id=user_id,
+        title=title,
+        description=description,
+        completed=False
+    )
+    
+    # Flush to get the generated id, then build the response before
+    # commit expires the instance (avoids a refresh SELECT)
+    session.add(task)
+    await session.flush()
+    result = {
+        "task_id": task.id,
+        "status": "created",
+        "title": task.title
+    }
+    await session.commit()
+    
+    logger.info("Created task %s for user %s: %s", result["task_id"], user_id, title)
+    
+    return result
 
 
+@_db_error_boundary("list tasks", wrap_in_list=True)
 async def list_tasks(
+    session: AsyncSession,
     user_id: str,
-    status: str = "all"
+    status: str = "all",
+    limit: int = 100,
+    offset: int = 0
 ) -> List[Dict[str, Any]]:
     """
     Retrieve tasks from the list.
     
     Args:
+        session: Database session
         user_id: ID of the user
         status: Filter by status - "all", "pending", or "completed" (default: "all")
+        limit: Maximum number of tasks to return (default: 100)
+        offset: Number of tasks to skip (default: 0)
         
     Returns:
         List of task dictionaries
     """
-    try:
-        with Session(engine) as session:
-            # Build query
-            query = select(Task).where(Task.user_id == user_id)
-            
-            # Apply status filter
-            if status == "pending":
-                query = query.where(Task.completed == False)
-            elif status == "completed":
-                query = query.where(Task.completed == True)
-            # "all" doesn't add any filter
-            
-            # Execute query
-            tasks = session.exec(query).all()
-            
-            # Convert to dictionaries
-            result = []
-            for task in tasks:
-                result.append({
-                    "task_id": task.id,
-                    "title": task.title,
-                    "description": task.description or "",
-                    "completed": task.completed,
-                    "created_at": task.created_at.isoformat() if task.created_at else None,
-                    "updated_at": task.updated_at.isoformat() if task.updated_at else None
-                })
-            
-            logger.info(f"Retrieved {len(result)} tasks for user {user_id} (status: {status})")
-            return result
-            
-    except Exception as e:
-        logger.error(f"Error listing tasks: {e}")
-        return [{
-            "error": True,
-            "message": f"Failed to list tasks: {str(e)}",
-            "code": "DATABASE_ERROR"
-        }]
+    # Build query (columns only, no ORM objects)
+    query = select(
+        Task.id,
+        Task.title,
+        Task.description,
+        Task.completed,
+        Task.created_at,
+        Task.updated_at
+    ).where(Task.user_id == user_id)
+    
+    # Apply status filter
+    if (status_filter := _STATUS_FILTER.get(status)) is not None:
+        query = query.where(status_filter)
+    
+    # Execute query
+    query = query.order_by(Task.id).limit(limit).offset(offset)
+    rows = (await session.exec(query)).all()
+    
+    # Convert to dictionaries
+    result = [
+        {
+            "task_id": row.id,
+            "title": row.title,
+            "description": row.description or "",
+            "completed": row.completed,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "updated_at": row.updated_at.isoformat() if row.updated_at else None
+        }
+        for row in rows
+    ]
+    
+    logger.info("Retrieved %d tasks for user %s (status: %s)", len(result), user_id, status)
+    return result
 
 
+@_db_error_boundary("complete task")
 async def complete_task(
+    session: AsyncSession,
     user_id: str,
     task_id: int
 ) -> Dict[str, Any]:
@@ -120,52 +156,42 @@ async def complete_task(
     Mark a task as completed.
     
     Args:
+        session: Database session
         user_id: ID of the user owning the task
         task_id: ID of the task to complete
         
     Returns:
         Dictionary with task_id and status
     """
-    try:
-        with Session(engine) as session:
-            # Find task
-            task = session.exec(
-                select(Task).where(
-                    Task.id == task_id,
-                    Task.user_id == user_id
-                )
-            ).first()
-            
-            if not task:
-                return {
-                    "error": True,
-                    "message": f"Task {task_id} not found or you don't have permission",
-                    "code": "NOT_FOUND"
-                }
-            
-            # Update task
-            task.completed = True
-            session.add(task)
-            session.commit()
-            
-            logger.info(f"Marked task {task_id} as completed for user {user_id}")
-            
-            return {
-                "task_id": task.id,
-                "status": "completed",
-                "title": task.title
-            }
-            
-    except Exception as e:
-        logger.error(f"Error completing task: {e}")
+    # Update task in a single statement, returning the title
+    result = await session.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .values(completed=True)
+        .returning(Task.title)
+    )
+    title = result.scalar_one_or_none()
+    await session.commit()
+    
+    if title is None:
         return {
             "error": True,
-            "message": f"Failed to complete task: {str(e)}",
-            "code": "DATABASE_ERROR"
+            "message": f"Task {task_id} not found or you don't have permission",
+            "code": "NOT_FOUND"
         }
+    
+    logger.info("Marked task %s as completed for user %s", task_id, user_id)
+    
+    return {
+        "task_id": task_id,
+        "status": "completed",
+        "title": title
+    }
 
 
+@_db_error_boundary("delete task")
 async def delete_task(
+    session: AsyncSession,
     user_id: str,
     task_id: int
 ) -> Dict[str, Any]:
@@ -173,51 +199,41 @@ async def delete_task(
     Delete a task.
     
     Args:
+        session: Database session
         user_id: ID of the user owning the task
         task_id: ID of the task to delete
         
     Returns:
         Dictionary with status and message
     """
-    try:
-        with Session(engine) as session:
-            # Find task
-            task = session.exec(
-                select(Task).where(
-                    Task.id == task_id,
-                    Task.user_id == user_id
-                )
-            ).first()
-            
-            if not task:
-                return {
-                    "error": True,
-                    "message": f"Task {task_id} not found or you don't have permission",
-                    "code": "NOT_FOUND"
-                }
-            
-            # Delete task
-            session.delete(task)
-            session.commit()
-            
-            logger.info(f"Deleted task {task_id} for user {user_id}")
-            
-            return {
-                "status": "deleted",
-                "task_id": task_id,
-                "message": f"Task '{task.title}' has been deleted"
-            }
-            
-    except Exception as e:
-        logger.error(f"Error deleting task: {e}")
+    # Delete task in a single statement, returning the title
+    result = await session.execute(
+        delete(Task)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .returning(Task.title)
+    )
+    title = result.scalar_one_or_none()
+    await session.commit()
+    
+    if title is None:
         return {
             "error": True,
-            "message": f"Failed to delete task: {str(e)}",
-            "code": "DATABASE_ERROR"
+            "message": f"Task {task_id} not found or you don't have permission",
+            "code": "NOT_FOUND"
         }
+    
+    logger.info("Deleted task %s for user %s", task_id, user_id)
+    
+    return {
+        "status": "deleted",
+        "task_id": task_id,
+        "message": f"Task '{title}' has been deleted"
+    }
 
 
+@_db_error_boundary("update task")
 async def update_task(
+    session: AsyncSession,
     user_id: str,
     task_id: int,
     title: Optional[str] = None,
@@ -227,6 +243,7 @@ async def update_task(
     Update task details.
     
     Args:
+        session: Database session
         user_id: ID of the user owning the task
         task_id: ID of the task to update
         title: New title (optional)
@@ -235,50 +252,124 @@ async def update_task(
     Returns:
         Dictionary with updated task details
     """
-    try:
-        with Session(engine) as session:
-            # Find task
-            task = session.exec(
-                select(Task).where(
-                    Task.id == task_id,
-                    Task.user_id == user_id
-                )
-            ).first()
-            
-            if not task:
-                return {
-                    "error": True,
-                    "message": f"Task {task_id} not found or you don't have permission",
-                    "code": "NOT_FOUND"
-                }
-            
-            # Update fields
-            if title is not None:
-                task.title = title
-            if description is not None:
-                task.description = description
-            
-            session.add(task)
-            session.commit()
-            session.refresh(task)
-            
-            logger.info(f"Updated task {task_id} for user {user_id}")
-            
-            return {
-                "task_id": task.id,
-                "status": "updated",
-                "title": task.title,
-                "description": task.description or "",
-                "completed": task.completed
-            }
-            
-    except Exception as e:
-        logger.error(f"Error updating task: {e}")
+    # Find task (primary key lookup, served from the identity map if loaded)
+    task = await session.get(Task, task_id)
+    
+    if task is None or task.user_id != user_id:
         return {
             "error": True,
-            "message": f"Failed to update task: {str(e)}",
-            "code": "DATABASE_ERROR"
+            "message": f"Task {task_id} not found or you don't have permission",
+            "code": "NOT_FOUND"
         }
+    
+    # Update fields
+    if title is not None:
+        task.title = title
+    if description is not None:
+        task.description = description
+    
+    # Build the response from the in-memory task before commit
+    # expires it (avoids a refresh SELECT)
+    result = {
+        "task_id": task.id,
+        "status": "updated",
+        "title": task.title,
+        "description": task.description or "",
+        "completed": task.completed
+    }
+    session.add(task)
+    await session.commit()
+    
+    logger.info("Updated task %s for user %s", task_id, user_id)
+    
+    return result
+
+
+# Gemini function declarations, built once and shared by all callers
+_TOOL_DEFINITIONS: List[Dict[str, Any]] = [
+    {
+        "name": "add_task",
+        "description": "Create a new task for the user",
+        "parameters": {
+            "type_": "OBJECT",
+            "properties": {
+                "title": {
+                    "type_": "STRING",
+                    "description": "Task title (required)"
+                },
+                "description": {
+                    "type_": "STRING",
+                    "description": "Task description (optional)"
+                }
+            },
+            "required": ["title"]
+        }
+    },
+    {
+        "name": "list_tasks",
+        "description": "Retrieve all tasks or filter by status (pending/completed)",
+        "parameters": {
+            "type_": "OBJECT",
+            "properties": {
+                "status": {
+                    "type_": "STRING",
+                    "description": "Filter by status: 'all', 'pending', or 'completed' (default: 'all')"
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "complete_task",
+        "description": "Mark a task as completed",
+        "parameters": {
+            "type_": "OBJECT",
+            "properties": {
+                "task_id": {
+                    "type_": "INTEGER",
+                    "description": "ID of the task to complete"
+                }
+            },
+            "required": ["task_id"]
+        }
+    },
+    {
+        "name": "delete_task",
+        "description": "Delete a task permanently",
+        "parameters": {
+            "type_": "OBJECT",
+            "properties": {
+                "task_id": {
+                    "type_": "INTEGER",
+                    "description": "ID of the task to delete"
+                }
+            },
+            "required": ["task_id"]
+        }
+    },
+    {
+        "name": "update_task",
+        "description": "Update task title and/or description",
+        "parameters": {
+            "type_": "OBJECT",
+            "properties": {
+                "task_id": {
+                    "type_": "INTEGER",
+                    "description": "ID of the task to update"
+                },
+                "title": {
+                    "type_": "STRING",
+                    "description": "New title (optional)"
+                },
+                "description": {
+                    "type_": "STRING",
+                    "description": "New description (optional)"
+                }
+            },
+            "required": ["task_id"]
+        }
+    }
+]
 
 
 def get_tool_definitions() -> List[Dict[str, Any]]:
@@ -286,89 +377,6 @@ def get_tool_definitions() -> List[Dict[str, Any]]:
     Get tool definitions in Gemini format.
     
     Returns:
-        List of function declarations for Gemini
+        List of function declarations for Gemini (shared; do not mutate)
     """
-    return [
-        {
-            "name": "add_task",
-            "description": "Create a new task for the user",
-            "parameters": {
-                "type_": "OBJECT",
-                "properties": {
-                    "title": {
-                        "type_": "STRING",
-                        "description": "Task title (required)"
-                    },
-                    "description": {
-                        "type_": "STRING",
-                        "description": "Task description (optional)"
-                    }
-                },
-                "required": ["title"]
-            }
-        },
-        {
-            "name": "list_tasks",
-            "description": "Retrieve all tasks or filter by status (pending/completed)",
-            "parameters": {
-                "type_": "OBJECT",
-                "properties": {
-                    "status": {
-                        "type_": "STRING",
-                        "description": "Filter by status: 'all', 'pending', or 'completed' (default: 'all')"
-                    }
-                },
-                "required": []
-            }
-        },
-        {
-            "name": "complete_task",
-            "description": "Mark a task as completed",
-            "parameters": {
-                "type_": "OBJECT",
-                "properties": {
-                    "task_id": {
-                        "type_": "INTEGER",
-                        "description": "ID of the task to complete"
-                    }
-                },
-                "required": ["task_id"]
-            }
-        },
-        {
-            "name": "delete_task",
-            "description": "Delete a task permanently",
-            "parameters": {
-                "type_": "OBJECT",
-                "properties": {
-                    "task_id": {
-                        "type_": "INTEGER",
-                        "description": "ID of the task to delete"
-                    }
-                },
-                "required": ["task_id"]
-            }
-        },
-        {
-            "name": "update_task",
-            "description": "Update task title and/or description",
-            "parameters": {
-                "type_": "OBJECT",
-                "properties": {
-                    "task_id": {
-                        "type_": "INTEGER",
-                        "description": "ID of the task to update"
-                    },
-                    "title": {
-                        "type_": "STRING",
-                        "description": "New title (optional)"
-                    },
-                    "description": {
-                        "type_": "STRING",
-                        "description": "New description (optional)"
-                    }
-                },
-                "required": ["task_id"]
-            }
-        }
-    ]
+    return _TOOL_DEFINITIONS
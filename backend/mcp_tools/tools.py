@@ -5,7 +5,8 @@ Exposes task operations as MCP tools for AI agents.
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from sqlmodel import Session, select
-from typing import Optional, List, Dict, Any
+from sqlalchemy import update
+from typing import Optional, List, Dict, Any, Final
 import logging
 
 from models import Task
@@ -52,7 +53,7 @@ async def add_task(
             session.commit()
             session.refresh(task)
             
-            logger.info(f"Created task {task.id} for user {user_id}: {title}")
+            logger.info("Created task %s for user %s: %s", task.id, user_id, title)
             
             return {
                 "task_id": task.id,
@@ -61,7 +62,7 @@ async def add_task(
             }
             
     except Exception as e:
-        logger.error(f"Error creating task: {e}")
+        logger.error("Error creating task: %s", e)
         return {
             "error": True,
             "message": f"Failed to create task: {str(e)}",
@@ -117,12 +118,12 @@ async def list_tasks(
                     "updated_at": task.updated_at.isoformat()
                 })
             
-            logger.info(f"Retrieved {len(result)} tasks for user {user_id} with status {status}")
+            logger.info("Retrieved %d tasks for user %s with status %s", len(result), user_id, status)
             
             return result
             
     except Exception as e:
-        logger.error(f"Error listing tasks: {e}")
+        logger.error("Error listing tasks: %s", e)
         return [{
             "error": True,
             "message": f"Failed to list tasks: {str(e)}",
@@ -151,42 +152,32 @@ async def complete_task(
     """
     try:
         with Session(engine) as session:
-            # Find the task
-            task = session.get(Task, task_id)
+            # Mark as completed in a single statement, returning the title
+            title = session.execute(
+                update(Task)
+                .where(Task.id == task_id, Task.user_id == user_id)
+                .values(completed=True)
+                .returning(Task.title)
+            ).scalar_one_or_none()
+            session.commit()
             
-            if not task:
+            if title is None:
                 return {
                     "error": True,
                     "message": f"Task {task_id} not found",
                     "code": "TASK_NOT_FOUND"
                 }
             
-            # Check ownership
-            if task.user_id != user_id:
-                return {
-                    "error": True,
-                    "message": "You don't have access to this task",
-                    "code": "UNAUTHORIZED"
-                }
-            
-            # Mark as completed
-            task.completed = True
-            task.updated_at = datetime.utcnow()
-            
-            session.add(task)
-            session.commit()
-            session.refresh(task)
-            
-            logger.info(f"Completed task {task_id} for user {user_id}")
+            logger.info("Completed task %s for user %s", task_id, user_id)
             
             return {
-                "task_id": task.id,
+                "task_id": task_id,
                 "status": "completed",
-                "title": task.title
+                "title": title
             }
             
     except Exception as e:
-        logger.error(f"Error completing task: {e}")
+        logger.error("Error completing task: %s", e)
         return {
             "error": True,
             "message": f"Failed to complete task: {str(e)}",
@@ -240,7 +231,7 @@ async def delete_task(
             session.delete(task)
             session.commit()
             
-            logger.info(f"Deleted task {task_id} for user {user_id}")
+            logger.info("Deleted task %s for user %s", task_id, user_id)
             
             return {
                 "task_id": task_id,
@@ -249,7 +240,7 @@ async def delete_task(
             }
             
     except Exception as e:
-        logger.error(f"Error deleting task: {e}")
+        logger.error("Error deleting task: %s", e)
         return {
             "error": True,
             "message": f"Failed to delete task: {str(e)}",
@@ -306,13 +297,11 @@ async def update_task(
             if description is not None:
                 task.description = description
             
-            task.updated_at = datetime.utcnow()
-            
             session.add(task)
             session.commit()
             session.refresh(task)
             
-            logger.info(f"Updated task {task_id} for user {user_id}")
+            logger.info("Updated task %s for user %s", task_id, user_id)
             
             return {
                 "task_id": task.id,
@@ -321,7 +310,7 @@ async def update_task(
             }
             
     except Exception as e:
-        logger.error(f"Error updating task: {e}")
+        logger.error("Error updating task: %s", e)
         return {
             "error": True,
             "message": f"Failed to update task: {str(e)}",
@@ -330,124 +319,122 @@ async def update_task(
 
 
 # ============================================================================
-# Import datetime (needed for update functions)
+# Helper Functions
 # ============================================================================
-from datetime import datetime
 
+# MCP tool definitions, built once and shared by all callers
+_MCP_TOOLS: Final[List[Dict[str, Any]]] = [
+    {
+        "name": "add_task",
+        "description": "Create a new task",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "ID of the user creating the task"
+                },
+                "title": {
+                    "type": "string",
+                    "description": "Task title"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "Task description (optional)"
+                }
+            },
+            "required": ["user_id", "title"]
+        }
+    },
+    {
+        "name": "list_tasks",
+        "description": "Retrieve tasks from the list",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "ID of the user"
+                },
+                "status": {
+                    "type": "string",
+                    "enum": ["all", "pending", "completed"],
+                    "description": "Filter by status (default: all)"
+                }
+            },
+            "required": ["user_id"]
+        }
+    },
+    {
+        "name": "complete_task",
+        "description": "Mark a task as complete",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "ID of the user"
+                },
+                "task_id": {
+                    "type": "integer",
+                    "description": "ID of the task to complete"
+                }
+            },
+            "required": ["user_id", "task_id"]
+        }
+    },
+    {
+        "name": "delete_task",
+        "description": "Remove a task from the list",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "ID of the user"
+                },
+                "task_id": {
+                    "type": "integer",
+                    "description": "ID of the task to delete"
+                }
+            },
+            "required": ["user_id", "task_id"]
+        }
+    },
+    {
+        "name": "update_task",
+        "description": "Modify task title or description",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "ID of the user"
+                },
+                "task_id": {
+                    "type": "integer",
+                    "description": "ID of the task to update"
+                },
+                "title": {
+                    "type": "string",
+                    "description": "New task title (optional)"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "New task description (optional)"
+                }
+            },
+            "required": ["user_id", "task_id"]
+        }
+    }
+]
 
-# ============================================================================
-# Helper Functions
-# ============================================================================
 
 def get_mcp_tools_list() -> List[Dict[str, Any]]:
     """
     Get list of all available MCP tools for the AI agent.
     
     Returns:
-        List of tool definitions
+        List of tool definitions (shared; do not mutate)
     """
-    return [
-        {
-            "name": "add_task",
-            "description": "Create a new task",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "ID of the user creating the task"
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "Task title"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "Task description (optional)"
-                    }
-                },
-                "required": ["user_id", "title"]
-            }
-        },
-        {
-            "name": "list_tasks",
-            "description": "Retrieve tasks from the list",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "ID of the user"
-                    },
-                    "status": {
-                        "type": "string",
-                        "enum": ["all", "pending", "completed"],
-                        "description": "Filter by status (default: all)"
-                    }
-                },
-                "required": ["user_id"]
-            }
-        },
-        {
-            "name": "complete_task",
-            "description": "Mark a task as complete",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "ID of the user"
-                    },
-                    "task_id": {
-                        "type": "integer",
-                        "description": "ID of the task to complete"
-                    }
-                },
-                "required": ["user_id", "task_id"]
-            }
-        },
-        {
-            "name": "delete_task",
-            "description": "Remove a task from the list",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "ID of the user"
-                    },
-                    "task_id": {
-                        "type": "integer",
-                        "description": "ID of the task to delete"
-                    }
-                },
-                "required": ["user_id", "task_id"]
-            }
-        },
-        {
-            "name": "update_task",
-            "description": "Modify task title or description",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "ID of the user"
-                    },
-                    "task_id": {
-                        "type": "integer",
-                        "description": "ID of the task to update"
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "New task title (optional)"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "New task description (optional)"
-                    }
-                },
-                "required": ["user_id", "task_id"]
-            }
-        }
-    ]
+    return _MCP_TOOLS
@@ -1,35 +1,93 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Path, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 from jwt.exceptions import ExpiredSignatureError, DecodeError, InvalidTokenError
+from cachetools import TTLCache
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
 from config import settings
+import hashlib
+import orjson
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-security = HTTPBearer()
+# auto_error=False: a missing header is rejected in get_auth_context with a
+# plain 401 instead of going through HTTPBearer's own error path
+security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> str:
+@dataclass(frozen=True)
+class AuthContext:
+    """Authenticated caller resolved from the request's bearer token."""
+    
+    user_id: str
+    payload: Dict[str, Any]
+
+
+class OrjsonPyJWT(jwt.PyJWT):
+    """PyJWT decoder that parses the token payload with orjson."""
+    
+    def _decode_payload(self, decoded):
+        try:
+            payload = orjson.loads(decoded["payload"])
+        except ValueError as e:
+            raise DecodeError(f"Invalid payload string: {e}")
+        if not isinstance(payload, dict):
+            raise DecodeError("Invalid payload string: must be a json object")
+        return payload
+
+
+jwt_decoder = OrjsonPyJWT()
+
+# Verified tokens: sha256(token) -> (AuthContext, exp). Entries live at most
+# 30 seconds (bounding the revocation window) and never past the token's exp.
+# Only successful verifications are cached.
+_token_cache = TTLCache(maxsize=10000, ttl=30)
+_token_cache_lock = threading.Lock()
+
+
+def get_auth_context(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> AuthContext:
     """
-    Verify JWT token and extract user_id.
+    Verify the JWT bearer token and build the request's auth context.
+    
+    FastAPI caches dependency results per request, so every dependency
+    that needs the caller shares this single verification.
     
     Args:
-        credentials: HTTP Bearer token credentials
+        credentials: HTTP Bearer token credentials, or None if missing
         
     Returns:
-        str: User ID from token
+        AuthContext: Authenticated user ID and token payload
         
     Raises:
-        HTTPException: If token is invalid, expired, or missing user_id
+        HTTPException: If token is missing, invalid, expired, or missing user_id
     """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     token = credentials.credentials
     
+    # Serve recently verified tokens without re-running jwt.decode
+    cache_key = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+    if cached is not None:
+        auth, exp = cached
+        if exp > time.time():
+            return auth
+    
     try:
         # Decode JWT token
-        payload = jwt.decode(
+        payload = jwt_decoder.decode(
             token,
             settings.BETTER_AUTH_SECRET,
             algorithms=["HS256"]
@@ -46,9 +104,15 @@ def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        auth = AuthContext(user_id=user_id, payload=payload)
+        with _token_cache_lock:
+            _token_cache[cache_key] = (auth, payload.get("exp", float("inf")))
+        
         logger.debug(f"Authenticated user: {user_id}")
-        return user_id
+        return auth
         
+    except HTTPException:
+        raise
     except ExpiredSignatureError:
         logger.warning("Expired token")
         raise HTTPException(
@@ -71,6 +135,43 @@ def get_current_user(
         )
 
 
+def get_current_user(auth: AuthContext = Depends(get_auth_context)) -> str:
+    """
+    Extract the authenticated user_id.
+    
+    Args:
+        auth: Auth context for the current request
+        
+    Returns:
+        str: User ID from token
+    """
+    return auth.user_id
+
+
+def require_path_user(
+    user_id: str = Path(...),
+    current_user: str = Depends(get_current_user)
+) -> str:
+    """
+    Check that the `user_id` path parameter matches the authenticated user.
+    
+    Declare it before the session dependency so rejected requests never
+    check out a database connection.
+    
+    Args:
+        user_id: User ID from URL path
+        current_user: User ID from JWT token
+        
+    Returns:
+        str: The verified user ID
+        
+    Raises:
+        HTTPException: If user IDs don't match
+    """
+    verify_user_access(user_id, current_user)
+    return user_id
+
+
 def verify_user_access(user_id: str, current_user_id: str):
     """
     Verify that the authenticated user matches the requested user_id.
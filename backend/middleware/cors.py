@@ -0,0 +1,235 @@
+"""
+CORS Middleware
+Pure ASGI implementation that answers preflight requests directly
+and adds CORS headers to all other responses.
+
+All header names and values are encoded once at startup, so the
+per-request path only scans the raw request headers and appends
+precomputed byte tuples.
+"""
+from typing import List, Sequence, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+SAFELISTED_HEADERS = {"Accept", "Accept-Language", "Content-Language", "Content-Type"}
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+PREFLIGHT_OK_BODY = b"OK"
+TEXT_CONTENT_TYPE = (b"content-type", b"text/plain; charset=utf-8")
+VARY_ORIGIN = (b"vary", b"Origin")
+
+
+def _encode(value: str) -> bytes:
+    return value.encode("latin-1")
+
+
+def _merge_headers(headers: RawHeaders, cors_headers: RawHeaders) -> RawHeaders:
+    """
+    Add `cors_headers` to a response's headers, replacing any the app set.
+
+    Vary is the exception: the app's values are kept and Origin is added
+    to them unless already listed.
+    """
+    if not cors_headers:
+        return list(headers)
+    names = {name for name, _ in cors_headers}
+    merged = [(name, value) for name, value in headers if name.lower() not in names]
+    for name, value in cors_headers:
+        if name == b"vary":
+            existing = [v for n, v in headers if n.lower() == b"vary"]
+            if existing:
+                tokens = {t.strip().lower() for v in existing for t in v.split(b",")}
+                if value.lower() not in tokens:
+                    existing.append(value)
+                value = b", ".join(existing)
+        merged.append((name, value))
+    return merged
+
+
+class CORSMiddleware:
+    """ASGI middleware for Cross-Origin Resource Sharing."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origins: Sequence[str] = (),
+        allow_methods: Sequence[str] = ("GET",),
+        allow_headers: Sequence[str] = (),
+        allow_credentials: bool = False,
+        expose_headers: Sequence[str] = (),
+        max_age: int = 600,
+    ):
+        self.app = app
+
+        if "*" in allow_methods:
+            allow_methods = ALL_METHODS
+
+        self.allow_all_origins = "*" in allow_origins
+        self.allow_all_headers = "*" in allow_headers
+        self.allow_origins = frozenset(allow_origins)
+        self.allow_methods = frozenset(allow_methods)
+        self.allow_headers = frozenset(
+            h.lower() for h in SAFELISTED_HEADERS | set(allow_headers)
+        )
+        self.allow_credentials = allow_credentials
+
+        # With a wildcard origin and no credentials every simple response gets
+        # the same headers, so the request's Origin never needs to be parsed
+        self._allow_any_origin = self.allow_all_origins and not allow_credentials
+
+        # Pre-encoded header values
+        self._allow_methods_bytes = _encode(", ".join(allow_methods))
+        self._allow_headers_bytes = _encode(", ".join(sorted(self.allow_headers)))
+        self._expose_headers_bytes = _encode(", ".join(expose_headers))
+        self._max_age_bytes = _encode(str(max_age))
+
+        # Allow-Origin header for every explicitly allowed origin
+        self._origin_headers = {
+            _encode(origin): (b"access-control-allow-origin", _encode(origin))
+            for origin in self.allow_origins
+            if origin != "*"
+        }
+
+        # Headers added to every non-preflight response
+        self._simple_headers: RawHeaders = []
+        if self.allow_all_origins:
+            self._simple_headers.append((b"access-control-allow-origin", b"*"))
+        if allow_credentials:
+            self._simple_headers.append((b"access-control-allow-credentials", b"true"))
+        if expose_headers:
+            self._simple_headers.append((b"access-control-expose-headers", self._expose_headers_bytes))
+
+        # Headers returned for every accepted preflight request
+        self._preflight_headers: RawHeaders = [
+            (b"access-control-allow-methods", self._allow_methods_bytes),
+            (b"access-control-max-age", self._max_age_bytes),
+        ]
+        if not self.allow_all_headers:
+            self._preflight_headers.append((b"access-control-allow-headers", self._allow_headers_bytes))
+        if allow_credentials:
+            self._preflight_headers.append((b"access-control-allow-credentials", b"true"))
+        self._preflight_headers.append(TEXT_CONTENT_TYPE)
+        self._preflight_headers.append((b"content-length", _encode(str(len(PREFLIGHT_OK_BODY)))))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Wildcard fast path: fixed headers, no origin parse or lookup
+        if self._allow_any_origin and scope["method"] != "OPTIONS":
+            await self.simple_response(scope, receive, send, self._simple_headers)
+            return
+
+        origin = None
+        requested_method = None
+        requested_headers = None
+        has_cookie = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                requested_method = value
+            elif name == b"access-control-request-headers":
+                requested_headers = value
+            elif name == b"cookie":
+                has_cookie = True
+
+        # Not a cross-origin request
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Preflight request: answer directly without reaching the app
+        if scope["method"] == "OPTIONS" and requested_method is not None:
+            await self.preflight_response(origin, requested_method, requested_headers, send)
+            return
+
+        await self.simple_response(
+            scope, receive, send, self.simple_headers_for(origin, has_cookie)
+        )
+
+    def allow_origin_header(self, origin: bytes):
+        """Return the Allow-Origin header echoing `origin`, or None if not allowed."""
+        header = self._origin_headers.get(origin)
+        if header is None and self.allow_all_origins:
+            header = (b"access-control-allow-origin", origin)
+        return header
+
+    async def preflight_response(
+        self,
+        origin: bytes,
+        requested_method: bytes,
+        requested_headers,
+        send: Send,
+    ) -> None:
+        """Send the response to a CORS preflight request."""
+        failures = []
+
+        origin_header = self.allow_origin_header(origin)
+        if origin_header is None:
+            failures.append("origin")
+
+        if requested_method.decode("latin-1") not in self.allow_methods:
+            failures.append("method")
+
+        if requested_headers is not None and not self.allow_all_headers:
+            for header in requested_headers.decode("latin-1").split(","):
+                if header.strip().lower() not in self.allow_headers:
+                    failures.append("headers")
+                    break
+
+        if failures:
+            body = _encode("Disallowed CORS " + ", ".join(failures))
+            headers = [TEXT_CONTENT_TYPE, (b"content-length", _encode(str(len(body))))]
+            await send({"type": "http.response.start", "status": 400, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = list(self._preflight_headers)
+        if self.allow_all_origins and not self.allow_credentials:
+            headers.append((b"access-control-allow-origin", b"*"))
+        else:
+            # Echo the origin back when a wildcard is not permitted; the
+            # response then depends on the Origin header
+            headers.append(origin_header)
+            headers.append(VARY_ORIGIN)
+        if self.allow_all_headers and requested_headers is not None:
+            headers.append((b"access-control-allow-headers", requested_headers))
+
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": PREFLIGHT_OK_BODY})
+
+    def simple_headers_for(self, origin: bytes, has_cookie: bool) -> RawHeaders:
+        """Return the CORS headers for a non-preflight request from `origin`."""
+        cors_headers = self._simple_headers
+        if self.allow_all_origins:
+            if has_cookie and self.allow_credentials:
+                # Credentialed requests cannot use the wildcard origin
+                cors_headers = [
+                    *(h for h in cors_headers if h[0] != b"access-control-allow-origin"),
+                    (b"access-control-allow-origin", origin),
+                    VARY_ORIGIN,
+                ]
+        else:
+            origin_header = self._origin_headers.get(origin)
+            if origin_header is not None:
+                cors_headers = [*cors_headers, origin_header, VARY_ORIGIN]
+        return cors_headers
+
+    async def simple_response(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        cors_headers: RawHeaders,
+    ) -> None:
+        """Forward the request to the app and add CORS headers to its response."""
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = _merge_headers(message.get("headers", ()), cors_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
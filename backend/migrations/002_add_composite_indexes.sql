@@ -0,0 +1,15 @@
+-- Migration: Add composite indexes for chat queries
+-- Description: Serve list_conversations (user_id, ORDER BY updated_at DESC) and
+-- conversation history (conversation_id, ORDER BY created_at) from one index each.
+-- The single-column indexes they replace are dropped.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_conv_user_updated ON conversations(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_msg_conv_created ON messages(conversation_id, created_at);
+
+DROP INDEX IF EXISTS idx_conversations_user_id;
+DROP INDEX IF EXISTS idx_conversations_updated_at;
+DROP INDEX IF EXISTS idx_messages_conversation_id;
+
+COMMIT;
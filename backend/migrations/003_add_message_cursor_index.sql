@@ -0,0 +1,9 @@
+-- Migration: Add message cursor index
+-- Description: Serve paginated conversation history
+-- (conversation_id = ? AND id < ? ORDER BY id DESC LIMIT n) as an index range scan.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_msg_conv_id ON messages(conversation_id, id);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- Migration: Store message role as SMALLINT
+-- Description: Replace the VARCHAR(20) role column with a SMALLINT code
+-- (0 = user, 1 = assistant) to shrink message rows.
+
+BEGIN;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'messages'
+          AND column_name = 'role'
+          AND data_type = 'character varying'
+    ) THEN
+        ALTER TABLE messages DROP CONSTRAINT IF EXISTS messages_role_check;
+        ALTER TABLE messages ALTER COLUMN role TYPE SMALLINT
+            USING CASE role WHEN 'user' THEN 0 ELSE 1 END;
+        ALTER TABLE messages ADD CONSTRAINT messages_role_check CHECK (role IN (0, 1));
+    END IF;
+END $$;
+
+COMMIT;
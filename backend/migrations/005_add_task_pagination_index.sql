@@ -0,0 +1,10 @@
+-- Migration: Add task pagination index
+-- Description: Serve GET /tasks keyset pagination
+-- (user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT n)
+-- as a backward index range scan.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS ix_task_user_created ON tasks(user_id, created_at, id);
+
+COMMIT;
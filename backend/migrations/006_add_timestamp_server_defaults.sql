@@ -0,0 +1,15 @@
+-- Migration: Add timestamp server defaults
+-- Description: Backfill database-side defaults for created_at/updated_at on
+-- tables built by SQLModel's create_all (001 already declares them). The ORM
+-- still stamps both columns in Python; these defaults only cover rows
+-- inserted outside the ORM.
+
+BEGIN;
+
+ALTER TABLE tasks ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE tasks ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE conversations ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE conversations ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE messages ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP;
+
+COMMIT;
@@ -9,7 +9,7 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from config import settings
 import logging
 
@@ -18,31 +18,30 @@ logger = logging.getLogger(__name__)
 
 
 def run_migration():
-    """Run the SQL migration script."""
+    """Run all SQL migration scripts in order."""
     try:
-        # Read SQL migration file
-        migration_file = Path(__file__).parent / "001_add_chat_tables.sql"
+        # Find SQL migration files (all scripts are idempotent)
+        migration_files = sorted(Path(__file__).parent.glob("*.sql"))
         
-        if not migration_file.exists():
-            logger.error(f"Migration file not found: {migration_file}")
+        if not migration_files:
+            logger.error("No migration files found")
             return False
         
-        with open(migration_file, 'r') as f:
-            sql_script = f.read()
-        
         # Connect to database
         logger.info(f"Connecting to database...")
         engine = create_engine(settings.DATABASE_URL)
         
-        # Execute migration
-        logger.info("Running migration...")
-        with engine.connect() as conn:
-            # Split by semicolons and execute each statement
-            for statement in sql_script.split(';'):
-                statement = statement.strip()
-                if statement and not statement.startswith('--'):
-                    conn.execute(text(statement))
-                    conn.commit()
+        # Each script wraps itself in BEGIN/COMMIT, so run it on an
+        # autocommit connection and let the script own its transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for migration_file in migration_files:
+                with open(migration_file, 'r') as f:
+                    sql_script = f.read()
+                
+                # Execute the whole script in one call (psycopg2 supports
+                # multiple statements, including $$-quoted function bodies)
+                logger.info("Running migration %s...", migration_file.name)
+                conn.exec_driver_sql(sql_script)
         
         logger.info("✅ Migration completed successfully!")
         logger.info("Tables created:")
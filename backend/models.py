@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Index, Integer, SmallInteger, func
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -10,6 +11,11 @@ class MessageRole(str, Enum):
     ASSISTANT = "assistant"
 
 
+# Roles are stored as SMALLINT codes; convert at the API/model boundary
+MESSAGE_ROLE_CODES = {MessageRole.USER: 0, MessageRole.ASSISTANT: 1}
+MESSAGE_ROLES_BY_CODE = {code: role.value for role, code in MESSAGE_ROLE_CODES.items()}
+
+
 class User(SQLModel, table=True):
     """User model - managed by Better Auth."""
     
@@ -27,35 +33,78 @@ class Task(SQLModel, table=True):
     """Task model for user's todo items."""
     
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_task_user_completed", "user_id", "completed"),
+        # Keyset pagination for the default sort; PostgreSQL scans it backwards
+        # for ORDER BY created_at DESC, id DESC
+        Index("ix_task_user_created", "user_id", "created_at", "id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(foreign_key="users.id", index=True)
     title: str = Field(max_length=200)
     description: Optional[str] = Field(default=None, max_length=1000)
     completed: bool = Field(default=False, index=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Timestamps are stamped in Python with microseconds (SQLite's now() has
+    # only whole seconds, which breaks keyset cursors and ETags); the server
+    # defaults cover rows inserted outside the ORM
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, server_default=func.now(), nullable=False, index=True)
+    )
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, server_default=func.now(), onupdate=datetime.utcnow, nullable=False)
+    )
 
 
 class Conversation(SQLModel, table=True):
     """Conversation model for AI chatbot sessions."""
     
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conv_user_updated", "user_id", "updated_at"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: str = Field(foreign_key="users.id", index=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    user_id: str = Field(foreign_key="users.id")
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, server_default=func.now(), nullable=False)
+    )
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, server_default=func.now(), onupdate=datetime.utcnow, nullable=False)
+    )
 
 
 class Message(SQLModel, table=True):
     """Message model for chat history."""
     
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_msg_conv_created", "conversation_id", "created_at"),
+        Index("ix_msg_conv_id", "conversation_id", "id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    conversation_id: int = Field(foreign_key="conversations.id", index=True)
+    conversation_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("conversations.id", ondelete="CASCADE"),
+            nullable=False
+        )
+    )
     user_id: str = Field(foreign_key="users.id", index=True)
-    role: str = Field(max_length=20)  # 'user' or 'assistant'
+    role: int = Field(
+        sa_column=Column(
+            SmallInteger,
+            CheckConstraint("role IN (0, 1)", name="messages_role_check"),
+            nullable=False
+        )
+    )  # see MESSAGE_ROLE_CODES
     content: str = Field()
-    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, server_default=func.now(), nullable=False, index=True)
+    )
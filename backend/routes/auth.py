@@ -1,9 +1,17 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlmodel import Session, select
+from sqlalchemy import exists, update
+from cachetools import TTLCache
 from pydantic import BaseModel, EmailStr
-import jwt
-from datetime import datetime, timedelta
+from datetime import timedelta
+from passlib.context import CryptContext
+import base64
 import hashlib
+import hmac
+import orjson
+import os
+import threading
+import time
 import uuid
 
 from db import get_session
@@ -15,6 +23,41 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Authentication"])
 
+# bcrypt for new hashes; hex_sha256 verifies legacy unsalted SHA256 hashes,
+# which are marked deprecated and upgraded to bcrypt on the next sign in
+pwd_context = CryptContext(schemes=["bcrypt", "hex_sha256"], deprecated="auto")
+
+
+def base64url_encode(data: bytes) -> bytes:
+    """Base64url-encode without padding, as used in JWTs."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUIDv7 (RFC 9562).
+    
+    The leading 48 bits are the Unix time in milliseconds, so new ids sort
+    after existing ones and B-tree inserts land on the rightmost leaf.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    # Set version (7) and RFC 4122 variant bits
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=value)
+
+
+# The JWT header is the same for every token, so encode it once
+JWT_HEADER_SEGMENT = base64url_encode(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+JWT_SIGNING_KEY = settings.BETTER_AUTH_SECRET.encode()
+ACCESS_TOKEN_LIFETIME_SECONDS = int(timedelta(days=7).total_seconds())
+
+# Sign-in lookups: email -> (id, email, name, password_hash). Entries live
+# 5 seconds, so bursts of logins for the same account skip the SELECT.
+# Unknown emails are never cached, so a fresh sign up can sign in at once.
+_signin_user_cache = TTLCache(maxsize=1024, ttl=5)
+_signin_user_cache_lock = threading.Lock()
+
 
 class SignUpRequest(BaseModel):
     email: EmailStr
@@ -36,21 +79,23 @@ class AuthResponse(BaseModel):
 
 
 def hash_password(password: str) -> str:
-    """Hash password using SHA256."""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password using bcrypt."""
+    return pwd_context.hash(password)
 
 
 def create_access_token(user_id: str, email: str) -> str:
-    """Create JWT access token."""
+    """Create HS256 JWT access token."""
+    now = int(time.time())
     payload = {
         "user_id": user_id,
         "sub": user_id,
         "email": email,
-        "exp": datetime.utcnow() + timedelta(days=7),
-        "iat": datetime.utcnow()
+        "exp": now + ACCESS_TOKEN_LIFETIME_SECONDS,
+        "iat": now
     }
-    token = jwt.encode(payload, settings.BETTER_AUTH_SECRET, algorithm="HS256")
-    return token
+    signing_input = JWT_HEADER_SEGMENT + b"." + base64url_encode(orjson.dumps(payload))
+    signature = hmac.new(JWT_SIGNING_KEY, signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + base64url_encode(signature)).decode("ascii")
 
 
 @router.post("/auth/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
@@ -68,12 +113,12 @@ def sign_up(request: SignUpRequest, session: Session = Depends(get_session)):
     Raises:
         HTTPException 400: If email already exists
     """
-    # Check if user already exists
-    existing_user = session.exec(
-        select(User).where(User.email == request.email)
-    ).first()
+    # Check if user already exists (SELECT EXISTS, no row is loaded)
+    email_taken = session.exec(
+        select(exists().where(User.email == request.email))
+    ).one()
     
-    if existing_user:
+    if email_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -87,30 +132,29 @@ def sign_up(request: SignUpRequest, session: Session = Depends(get_session)):
         )
     
     # Create new user
+    user_id = str(uuid7())
     user = User(
-        id=str(uuid.uuid4()),
+        id=user_id,
         email=request.email,
         name=request.name,
-        password_hash=hash_password(request.password),
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        password_hash=hash_password(request.password)
     )
     
     session.add(user)
     session.commit()
-    session.refresh(user)
     
-    # Generate token
-    access_token = create_access_token(user.id, user.email)
+    # Every column was set here, so build the response from the request
+    # instead of reloading the (now expired) instance
+    access_token = create_access_token(user_id, request.email)
     
-    logger.info(f"New user registered: {user.email}")
+    logger.info(f"New user registered: {request.email}")
     
     return AuthResponse(
         access_token=access_token,
         token_type="bearer",
-        user_id=user.id,
-        email=user.email,
-        name=user.name
+        user_id=user_id,
+        email=request.email,
+        name=request.name
     )
 
 
@@ -129,25 +173,44 @@ def sign_in(request: SignInRequest, session: Session = Depends(get_session)):
     Raises:
         HTTPException 401: If credentials are invalid
     """
-    # Find user
-    user = session.exec(
-        select(User).where(User.email == request.email)
-    ).first()
+    # Find user (recently seen accounts are served from the cache)
+    with _signin_user_cache_lock:
+        user = _signin_user_cache.get(request.email)
+    if user is None:
+        user = session.exec(
+            select(User.id, User.email, User.name, User.password_hash)
+            .where(User.email == request.email)
+        ).first()
+        if user is not None:
+            with _signin_user_cache_lock:
+                _signin_user_cache[request.email] = user
     
     if not user:
+        # Spend the same time as a real verification so response timing
+        # doesn't reveal whether the email is registered
+        pwd_context.dummy_verify()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
-    # Verify password
-    password_hash = hash_password(request.password)
-    if user.password_hash != password_hash:
+    # Verify password (constant-time compare)
+    valid, new_hash = pwd_context.verify_and_update(request.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
+    # Upgrade legacy or outdated hashes
+    if new_hash is not None:
+        session.execute(
+            update(User).where(User.id == user.id).values(password_hash=new_hash)
+        )
+        session.commit()
+        with _signin_user_cache_lock:
+            _signin_user_cache.pop(request.email, None)
+    
     # Generate token
     access_token = create_access_token(user.id, user.email)
     
@@ -2,18 +2,21 @@
 Chat Routes for Phase III
 Handles AI chatbot interactions through natural language.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
+from sqlmodel import select, func
+from sqlalchemy import delete, exists
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 import logging
 
-from db import get_session
-from middleware.auth import get_current_user
+from db import get_async_session
+from middleware.auth import require_path_user
 from schemas import (
-    ChatRequest, ChatResponse, ToolCall,
-    ConversationResponse, ConversationHistoryResponse, MessageResponse
+    ChatRequest, ChatResponse,
+    ConversationResponse, ConversationHistoryResponse
 )
-from models import Conversation, Message
+from models import Conversation, Message, MESSAGE_ROLES_BY_CODE
 from services.ai_service import ai_service
 
 logger = logging.getLogger(__name__)
@@ -29,10 +32,9 @@ router = APIRouter(tags=["chat"])
     description="Send a message to the AI chatbot and receive a response with task management capabilities"
 )
 async def chat(
-    user_id: str,
     request: ChatRequest,
-    current_user: str = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    user_id: str = Depends(require_path_user),
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Send a message to the AI chatbot.
@@ -51,35 +53,22 @@ async def chat(
     - "Delete the meeting task"
     """
     try:
-        # Verify user matches authenticated user
-        if current_user != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Cannot access another user's chat"
-            )
-        
         # Process chat through AI service
         conversation_id, response_text, tool_calls_data = await ai_service.chat(
             user_id=user_id,
             message=request.message,
+            session=session,
             conversation_id=request.conversation_id
         )
         
-        # Format tool calls for response
-        tool_calls = [
-            ToolCall(
-                tool=tc["tool"],
-                arguments=tc["arguments"],
-                result=tc["result"]
-            )
-            for tc in tool_calls_data
-        ]
-        
-        return ChatResponse(
-            conversation_id=conversation_id,
-            response=response_text,
-            tool_calls=tool_calls
-        )
+        # Tool call records already match the ToolCall shape; returning plain
+        # data lets response_model validate them once instead of building
+        # the models here and re-validating them on the way out
+        return {
+            "conversation_id": conversation_id,
+            "response": response_text,
+            "tool_calls": tool_calls_data
+        }
         
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
@@ -96,46 +85,32 @@ async def chat(
     description="Get all conversations for the authenticated user"
 )
 async def list_conversations(
-    user_id: str,
-    current_user: str = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    user_id: str = Depends(require_path_user),
+    session: AsyncSession = Depends(get_async_session)
 ):
     """List all conversations for a user."""
     try:
-        # Verify user matches authenticated user
-        if current_user != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Cannot access another user's conversations"
-            )
-        
-        # Query conversations with message counts
+        # Query conversations with message counts in a single aggregate
         query = (
-            select(Conversation)
+            select(Conversation, func.count(Message.id))
+            .join(Message, Message.conversation_id == Conversation.id, isouter=True)
             .where(Conversation.user_id == user_id)
+            .group_by(Conversation.id)
             .order_by(Conversation.updated_at.desc())
         )
         
-        conversations = session.exec(query).all()
+        rows = (await session.exec(query)).all()
         
-        # Add message counts
-        result = []
-        for conv in conversations:
-            msg_count = session.exec(
-                select(Message).where(Message.conversation_id == conv.id)
-            ).all()
-            
-            result.append(
-                ConversationResponse(
-                    id=conv.id,
-                    user_id=conv.user_id,
-                    created_at=conv.created_at,
-                    updated_at=conv.updated_at,
-                    message_count=len(msg_count)
-                )
+        return [
+            ConversationResponse(
+                id=conv.id,
+                user_id=conv.user_id,
+                created_at=conv.created_at,
+                updated_at=conv.updated_at,
+                message_count=message_count
             )
-        
-        return result
+            for conv, message_count in rows
+        ]
         
     except HTTPException:
         raise
@@ -151,54 +126,76 @@ async def list_conversations(
     "/{user_id}/conversations/{conversation_id}",
     response_model=ConversationHistoryResponse,
     summary="Get conversation history",
-    description="Get all messages in a specific conversation"
+    description="Get messages in a specific conversation, newest page first"
 )
 async def get_conversation_history(
-    user_id: str,
     conversation_id: int,
-    current_user: str = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    user_id: str = Depends(require_path_user),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of messages to return"),
+    before_id: Optional[int] = Query(None, description="Return messages older than this message ID"),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Get all messages in a conversation."""
+    """
+    Get a page of messages in a conversation.
+    
+    Returns the most recent `limit` messages (older than `before_id` if
+    given) in chronological order. Pass `next_cursor` back as `before_id`
+    to fetch the previous page.
+    """
     try:
-        # Verify user matches authenticated user
-        if current_user != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Cannot access another user's conversations"
+        # Get one page of messages, newest first (columns only, no ORM objects).
+        # Joining the conversation applies the ownership check in the same query
+        query = (
+            select(
+                Message.id, Message.user_id, Message.role, Message.content, Message.created_at
             )
-        
-        # Verify conversation exists and belongs to user
-        conversation = session.get(Conversation, conversation_id)
-        if not conversation or conversation.user_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Conversation not found"
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(
+                Message.conversation_id == conversation_id,
+                Conversation.user_id == user_id
             )
-        
-        # Get messages
-        query = (
-            select(Message)
-            .where(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at.asc())
         )
+        if before_id is not None:
+            query = query.where(Message.id < before_id)
+        query = query.order_by(Message.id.desc()).limit(limit)
         
-        messages = session.exec(query).all()
+        messages = (await session.exec(query)).all()
         
-        return ConversationHistoryResponse(
-            conversation_id=conversation_id,
-            messages=[
-                MessageResponse(
-                    id=msg.id,
-                    conversation_id=msg.conversation_id,
-                    user_id=msg.user_id,
-                    role=msg.role,
-                    content=msg.content,
-                    created_at=msg.created_at
+        # An empty page may also mean the conversation doesn't exist or
+        # belongs to someone else; only then is a second query needed
+        if not messages:
+            owned = (await session.exec(
+                select(exists().where(
+                    Conversation.id == conversation_id,
+                    Conversation.user_id == user_id
+                ))
+            )).one()
+            if not owned:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Conversation not found"
                 )
-                for msg in messages
-            ]
-        )
+        
+        # A full page means there may be older messages
+        next_cursor = messages[-1].id if len(messages) == limit else None
+        
+        # Rows come straight from the DB, so encode them directly with orjson
+        # instead of building and re-validating a MessageResponse per message
+        return ORJSONResponse({
+            "conversation_id": conversation_id,
+            "messages": [
+                {
+                    "id": msg.id,
+                    "conversation_id": conversation_id,
+                    "user_id": msg.user_id,
+                    "role": MESSAGE_ROLES_BY_CODE[msg.role],
+                    "content": msg.content,
+                    "created_at": msg.created_at
+                }
+                for msg in reversed(messages)
+            ],
+            "next_cursor": next_cursor
+        })
         
     except HTTPException:
         raise
@@ -217,39 +214,40 @@ async def get_conversation_history(
     description="Delete a conversation and all its messages"
 )
 async def delete_conversation(
-    user_id: str,
     conversation_id: int,
-    current_user: str = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    user_id: str = Depends(require_path_user),
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Delete a conversation and all its messages."""
     try:
-        # Verify user matches authenticated user
-        if current_user != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Cannot delete another user's conversations"
-            )
+        owned_conversation = select(Conversation.id).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == user_id
+        )
+        
+        # Delete the messages first, only if the conversation belongs to the
+        # user. The model declares ON DELETE CASCADE, but databases created by
+        # an older create_all (before the cascade was added) lack it, and there
+        # deleting the conversation first would violate the FK
+        await session.execute(
+            delete(Message).where(Message.conversation_id.in_(owned_conversation))
+        )
         
-        # Verify conversation exists and belongs to user
-        conversation = session.get(Conversation, conversation_id)
-        if not conversation or conversation.user_id != user_id:
+        # Delete the conversation; no matched row means it doesn't exist or
+        # belongs to someone else (nothing was deleted above either)
+        result = await session.execute(
+            delete(Conversation).where(
+                Conversation.id == conversation_id,
+                Conversation.user_id == user_id
+            )
+        )
+        if result.rowcount == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Conversation not found"
             )
         
-        # Delete all messages (cascade should handle this, but being explicit)
-        messages = session.exec(
-            select(Message).where(Message.conversation_id == conversation_id)
-        ).all()
-        
-        for msg in messages:
-            session.delete(msg)
-        
-        # Delete conversation
-        session.delete(conversation)
-        session.commit()
+        await session.commit()
         
         return {
             "status": "deleted",
@@ -1,65 +1,187 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlmodel import Session, select
-from typing import List
+from sqlalchemy import bindparam, delete, tuple_, update
+from typing import Any, List, Optional, Tuple
 from datetime import datetime
+from functools import lru_cache
+import base64
+import hashlib
+import orjson
 import logging
 
 from db import get_session
 from models import Task
 from schemas import TaskCreate, TaskUpdate, TaskToggleComplete, TaskResponse
-from middleware.auth import get_current_user, verify_user_access
+from middleware.auth import require_path_user
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/{user_id}/tasks", tags=["tasks"])
 
+# Columns of TaskResponse, selected/returned directly instead of loading Task
+TASK_COLUMNS = (
+    Task.id, Task.user_id, Task.title, Task.description,
+    Task.completed, Task.created_at, Task.updated_at
+)
+
+# Keyset pagination: each sort orders by (key, id) and pages with a row-value
+# comparison on the same pair, so every page is an index range scan.
+# sort -> (key column, descending)
+SORT_KEYS = {
+    "created": (Task.created_at, True),
+    "updated": (Task.updated_at, True),
+    "title": (Task.title, False),
+}
+
+# Hot statements are built once with bound parameters, so each request
+# only binds values instead of reconstructing the query
+GET_TASK_STMT = select(*TASK_COLUMNS).where(
+    Task.id == bindparam("task_id"),
+    Task.user_id == bindparam("user_id")
+)
+
+
+@lru_cache(maxsize=None)
+def task_list_statement(status_filter: str, sort_by: str, after_cursor: bool):
+    """
+    Build the task list query for one (status, sort, cursor) combination.
+    
+    Callers must pass a known status and sort (the cache holds one statement
+    per combination). Values are bound at execution: user_id and limit, plus
+    cursor_key and cursor_id when after_cursor is set.
+    """
+    # Columns only; rows are encoded without ORM objects
+    statement = select(*TASK_COLUMNS).where(Task.user_id == bindparam("user_id"))
+    
+    # Apply status filter
+    if status_filter == "pending":
+        statement = statement.where(Task.completed == False)
+    elif status_filter == "completed":
+        statement = statement.where(Task.completed == True)
+    
+    # Apply sorting, with id as the tie-breaker
+    sort_key, descending = SORT_KEYS[sort_by]
+    if descending:
+        statement = statement.order_by(sort_key.desc(), Task.id.desc())
+    else:
+        statement = statement.order_by(sort_key, Task.id)
+    
+    # Seek past the previous page
+    if after_cursor:
+        key_row = tuple_(sort_key, Task.id)
+        cursor_row = tuple_(
+            bindparam("cursor_key", type_=sort_key.type),
+            bindparam("cursor_id", type_=Task.id.type)
+        )
+        statement = statement.where(key_row < cursor_row if descending else key_row > cursor_row)
+    
+    return statement.limit(bindparam("limit"))
+
+
+def encode_cursor(value: Any, task_id: int) -> str:
+    """Encode the (sort key, id) of the last row on a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(orjson.dumps([value, task_id])).decode("ascii")
+
+
+def decode_cursor(cursor: str, is_datetime: bool) -> Tuple[Any, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        value, task_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        if is_datetime:
+            value = datetime.fromisoformat(value)
+        return value, int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+# Clients must revalidate every time, but an unchanged response costs only a 304
+CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+
+def make_etag(body: bytes) -> str:
+    """Build a strong ETag from an encoded response body."""
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
 
 @router.get("", response_model=List[TaskResponse])
 def get_tasks(
-    user_id: str,
     status_filter: str = Query("all", alias="status", description="Filter by status: all, pending, completed"),
     sort_by: str = Query("created", alias="sort", description="Sort by: created, title, updated"),
-    session: Session = Depends(get_session),
-    current_user_id: str = Depends(get_current_user)
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of tasks to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(require_path_user),
+    session: Session = Depends(get_session)
 ):
     """
-    Get all tasks for authenticated user.
+    Get a page of tasks for authenticated user.
     
     Query Parameters:
     - status: Filter by status (all, pending, completed)
     - sort: Sort order (created, title, updated)
-    """
-    # Verify user has access
-    verify_user_access(user_id, current_user_id)
-    
-    # Build query
-    statement = select(Task).where(Task.user_id == user_id)
+    - limit: Page size (1-100)
+    - cursor: Cursor from the previous page's X-Next-Cursor header
     
-    # Apply status filter
-    if status_filter == "pending":
-        statement = statement.where(Task.completed == False)
-    elif status_filter == "completed":
-        statement = statement.where(Task.completed == True)
-    
-    # Apply sorting
-    if sort_by == "title":
-        statement = statement.order_by(Task.title)
-    elif sort_by == "updated":
-        statement = statement.order_by(Task.updated_at.desc())
-    else:  # default: created
-        statement = statement.order_by(Task.created_at.desc())
-    
-    tasks = session.exec(statement).all()
-    logger.info(f"Retrieved {len(tasks)} tasks for user {user_id}")
-    return tasks
+    When more tasks remain, the X-Next-Cursor response header holds the
+    cursor for the next page. Responses carry an ETag; a matching
+    If-None-Match gets 304 Not Modified.
+    """
+    # Unknown values fall back to the defaults (all, created)
+    if status_filter not in ("pending", "completed"):
+        status_filter = "all"
+    if sort_by not in SORT_KEYS:
+        sort_by = "created"
+    sort_key = SORT_KEYS[sort_by][0]
+    
+    # Fetch one extra row to learn whether another page exists
+    params = {"user_id": user_id, "limit": limit + 1}
+    if cursor is not None:
+        params["cursor_key"], params["cursor_id"] = decode_cursor(
+            cursor, is_datetime=sort_key is not Task.title
+        )
+    statement = task_list_statement(status_filter, sort_by, cursor is not None)
+    tasks = [row._asdict() for row in session.exec(statement, params=params)]
+    headers = dict(CACHE_HEADERS)
+    if len(tasks) > limit:
+        del tasks[limit:]
+        last = tasks[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last[sort_key.key], last["id"])
+    
+    # Rows already have the TaskResponse shape; encode them directly instead
+    # of validating a model per task. The ETag hashes the page itself, so any
+    # change to a listed task (or to which tasks are listed) changes it
+    body = orjson.dumps(tasks)
+    headers["ETag"] = make_etag(body)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    logger.info("Retrieved %d tasks for user %s", len(tasks), user_id)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 def create_task(
-    user_id: str,
     task_data: TaskCreate,
-    session: Session = Depends(get_session),
-    current_user_id: str = Depends(get_current_user)
+    user_id: str = Depends(require_path_user),
+    session: Session = Depends(get_session)
 ):
     """
     Create a new task for authenticated user.
@@ -68,33 +190,28 @@ def create_task(
     - title: Task title (required, 1-200 chars)
     - description: Task description (optional, max 1000 chars)
     """
-    # Verify user has access
-    verify_user_access(user_id, current_user_id)
-    
     # Create task
     task = Task(
         user_id=user_id,
         title=task_data.title,
         description=task_data.description,
-        completed=False,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        completed=False
     )
     
     session.add(task)
     session.commit()
     session.refresh(task)
     
-    logger.info(f"Created task {task.id} for user {user_id}")
+    logger.info("Created task %s for user %s", task.id, user_id)
     return task
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
-    user_id: str,
     task_id: int,
-    session: Session = Depends(get_session),
-    current_user_id: str = Depends(get_current_user)
+    if_none_match: Optional[str] = Header(None),
+    user_id: str = Depends(require_path_user),
+    session: Session = Depends(get_session)
 ):
     """
     Get details of a specific task.
@@ -102,34 +219,39 @@ def get_task(
     Path Parameters:
     - user_id: User ID
     - task_id: Task ID
-    """
-    # Verify user has access
-    verify_user_access(user_id, current_user_id)
     
-    # Get task
-    statement = select(Task).where(
-        Task.id == task_id,
-        Task.user_id == user_id
-    )
-    task = session.exec(statement).first()
+    The response carries an ETag; a matching If-None-Match gets
+    304 Not Modified.
+    """
+    # Get task (columns only, no ORM object)
+    task = session.exec(
+        GET_TASK_STMT, params={"task_id": task_id, "user_id": user_id}
+    ).first()
     
     if not task:
-        logger.warning(f"Task {task_id} not found for user {user_id}")
+        logger.warning("Task %s not found for user %s", task_id, user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    return task
+    # The row already has the TaskResponse shape; encode it directly and
+    # derive the ETag from the encoded task
+    body = orjson.dumps(task._asdict())
+    etag = make_etag(body)
+    headers = {"ETag": etag, **CACHE_HEADERS}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
 def update_task(
-    user_id: str,
     task_id: int,
     task_data: TaskUpdate,
-    session: Session = Depends(get_session),
-    current_user_id: str = Depends(get_current_user)
+    user_id: str = Depends(require_path_user),
+    session: Session = Depends(get_session)
 ):
     """
     Update a task.
@@ -142,45 +264,40 @@ def update_task(
     - title: New task title (optional)
     - description: New task description (optional)
     """
-    # Verify user has access
-    verify_user_access(user_id, current_user_id)
-    
-    # Get task
-    statement = select(Task).where(
-        Task.id == task_id,
-        Task.user_id == user_id
-    )
-    task = session.exec(statement).first()
-    
-    if not task:
-        logger.warning(f"Task {task_id} not found for user {user_id}")
+    # Update fields (updated_at is always set so that an update with no
+    # fields still has a SET clause; otherwise the column's onupdate fills it)
+    values = {"updated_at": datetime.utcnow()}
+    if task_data.title is not None:
+        values["title"] = task_data.title
+    if task_data.description is not None:
+        values["description"] = task_data.description
+    
+    # Update and read back in one statement; no row means not found
+    task = session.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .values(**values)
+        .returning(*TASK_COLUMNS)
+    ).one_or_none()
+    
+    if task is None:
+        logger.warning("Task %s not found for user %s", task_id, user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    # Update fields
-    if task_data.title is not None:
-        task.title = task_data.title
-    if task_data.description is not None:
-        task.description = task_data.description
-    
-    task.updated_at = datetime.utcnow()
-    
-    session.add(task)
     session.commit()
-    session.refresh(task)
     
-    logger.info(f"Updated task {task_id} for user {user_id}")
-    return task
+    logger.info("Updated task %s for user %s", task_id, user_id)
+    return task._asdict()
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(
-    user_id: str,
     task_id: int,
-    session: Session = Depends(get_session),
-    current_user_id: str = Depends(get_current_user)
+    user_id: str = Depends(require_path_user),
+    session: Session = Depends(get_session)
 ):
     """
     Delete a task.
@@ -189,38 +306,30 @@ def delete_task(
     - user_id: User ID
     - task_id: Task ID
     """
-    # Verify user has access
-    verify_user_access(user_id, current_user_id)
-    
-    # Get task
-    statement = select(Task).where(
-        Task.id == task_id,
-        Task.user_id == user_id
+    # Delete task in one statement; no matched row means not found
+    result = session.execute(
+        delete(Task).where(Task.id == task_id, Task.user_id == user_id)
     )
-    task = session.exec(statement).first()
     
-    if not task:
-        logger.warning(f"Task {task_id} not found for user {user_id}")
+    if result.rowcount == 0:
+        logger.warning("Task %s not found for user %s", task_id, user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    # Delete task
-    session.delete(task)
     session.commit()
     
-    logger.info(f"Deleted task {task_id} for user {user_id}")
+    logger.info("Deleted task %s for user %s", task_id, user_id)
     return None
 
 
 @router.patch("/{task_id}/complete", response_model=TaskResponse)
 def toggle_task_completion(
-    user_id: str,
     task_id: int,
     completion_data: TaskToggleComplete,
-    session: Session = Depends(get_session),
-    current_user_id: str = Depends(get_current_user)
+    user_id: str = Depends(require_path_user),
+    session: Session = Depends(get_session)
 ):
     """
     Toggle task completion status.
@@ -232,30 +341,22 @@ def toggle_task_completion(
     Request Body:
     - completed: New completion status (true/false)
     """
-    # Verify user has access
-    verify_user_access(user_id, current_user_id)
-    
-    # Get task
-    statement = select(Task).where(
-        Task.id == task_id,
-        Task.user_id == user_id
-    )
-    task = session.exec(statement).first()
-    
-    if not task:
-        logger.warning(f"Task {task_id} not found for user {user_id}")
+    # Update completion status and read back in one statement
+    task = session.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .values(completed=completion_data.completed)
+        .returning(*TASK_COLUMNS)
+    ).one_or_none()
+    
+    if task is None:
+        logger.warning("Task %s not found for user %s", task_id, user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    # Update completion status
-    task.completed = completion_data.completed
-    task.updated_at = datetime.utcnow()
-    
-    session.add(task)
     session.commit()
-    session.refresh(task)
     
-    logger.info(f"Toggled completion for task {task_id} to {task.completed}")
-    return task
+    logger.info("Toggled completion for task %s to %s", task_id, task.completed)
+    return task._asdict()
@@ -1,50 +1,37 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, field_validator
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any
+
+
+# Strip whitespace and check lengths in pydantic-core, without Python validators
+TaskTitle = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=200)]
+TaskDescription = Annotated[str, StringConstraints(strip_whitespace=True, max_length=1000)]
 
 
 class TaskCreate(BaseModel):
     """Schema for creating a new task."""
     
-    title: str = Field(..., min_length=1, max_length=200, description="Task title")
-    description: Optional[str] = Field(None, max_length=1000, description="Task description")
-    
-    @validator('title')
-    def title_must_not_be_empty(cls, v):
-        """Validate title is not just whitespace."""
-        if not v or not v.strip():
-            raise ValueError('Title cannot be empty or whitespace')
-        return v.strip()
+    title: TaskTitle = Field(..., description="Task title")
+    description: Optional[TaskDescription] = Field(None, description="Task description")
     
-    @validator('description')
-    def description_strip(cls, v):
-        """Strip description whitespace."""
-        if v:
-            return v.strip() if v.strip() else None
-        return v
+    @field_validator('description')
+    @classmethod
+    def description_empty_to_none(cls, v):
+        """Treat a blank description as no description."""
+        return v or None
 
 
 class TaskUpdate(BaseModel):
     """Schema for updating a task."""
     
-    title: Optional[str] = Field(None, min_length=1, max_length=200, description="Task title")
-    description: Optional[str] = Field(None, max_length=1000, description="Task description")
+    title: Optional[TaskTitle] = Field(None, description="Task title")
+    description: Optional[TaskDescription] = Field(None, description="Task description")
     
-    @validator('title')
-    def title_must_not_be_empty(cls, v):
-        """Validate title is not just whitespace."""
-        if v is not None:
-            if not v.strip():
-                raise ValueError('Title cannot be empty or whitespace')
-            return v.strip()
-        return v
-    
-    @validator('description')
-    def description_strip(cls, v):
-        """Strip description whitespace."""
-        if v is not None:
-            return v.strip() if v.strip() else None
-        return v
+    @field_validator('description')
+    @classmethod
+    def description_empty_to_none(cls, v):
+        """Treat a blank description as no description."""
+        return v or None
 
 
 class TaskToggleComplete(BaseModel):
@@ -56,6 +43,8 @@ class TaskToggleComplete(BaseModel):
 class TaskResponse(BaseModel):
     """Schema for task response."""
     
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     user_id: str
     title: str
@@ -63,9 +52,6 @@ class TaskResponse(BaseModel):
     completed: bool
     created_at: datetime
     updated_at: datetime
-    
-    class Config:
-        from_attributes = True
 
 
 class HealthResponse(BaseModel):
@@ -84,14 +70,9 @@ class ChatRequest(BaseModel):
     """Schema for chat message request."""
     
     conversation_id: Optional[int] = Field(None, description="Existing conversation ID (creates new if not provided)")
-    message: str = Field(..., min_length=1, description="User's natural language message")
-    
-    @validator('message')
-    def message_must_not_be_empty(cls, v):
-        """Validate message is not just whitespace."""
-        if not v or not v.strip():
-            raise ValueError('Message cannot be empty or whitespace')
-        return v.strip()
+    message: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)] = Field(
+        ..., description="User's natural language message"
+    )
 
 
 class ToolCall(BaseModel):
@@ -113,28 +94,26 @@ class ChatResponse(BaseModel):
 class MessageResponse(BaseModel):
     """Schema for message response."""
     
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     conversation_id: int
     user_id: str
     role: str
     content: str
     created_at: datetime
-    
-    class Config:
-        from_attributes = True
 
 
 class ConversationResponse(BaseModel):
     """Schema for conversation response."""
     
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     user_id: str
     created_at: datetime
     updated_at: datetime
     message_count: Optional[int] = None
-    
-    class Config:
-        from_attributes = True
 
 
 class ConversationHistoryResponse(BaseModel):
@@ -142,3 +121,4 @@ class ConversationHistoryResponse(BaseModel):
     
     conversation_id: int
     messages: List[MessageResponse]
+    next_cursor: Optional[int] = Field(None, description="Pass as before_id to fetch older messages")
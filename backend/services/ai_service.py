@@ -3,14 +3,15 @@ AI Service for Chat Functionality (Using Google Gemini)
 Handles interactions with Google Gemini API and MCP tools.
 """
 import google.generativeai as genai
-import json
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from sqlmodel import Session, select
 from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlmodel import select
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from models import Conversation, Message
-from db import engine
+from models import Conversation, Message, MessageRole, MESSAGE_ROLE_CODES
 from config import settings
 from mcp_tools.task_operations import (
     add_task, list_tasks, complete_task, delete_task, update_task, get_tool_definitions
@@ -25,11 +26,7 @@ else:
     logger.warning("GOOGLE_API_KEY not set - AI chat functionality will not work")
 
 
-class AIService:
-    """Service for handling AI chat interactions with MCP tools using Google Gemini."""
-    
-    def __init__(self):
-        self.system_instruction = """You are a friendly and helpful AI task management assistant.
+SYSTEM_INSTRUCTION = """You are a friendly and helpful AI task management assistant.
 You can help users manage their tasks through natural language commands.
 
 Your capabilities:
@@ -49,60 +46,122 @@ Always:
 When listing tasks, format them as a numbered list for easy reading.
 When completing actions, confirm what was done.
 """
-        # Get tool definitions and initialize model with tools
-        tools = self.get_gemini_tools()
-        self.model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            system_instruction=self.system_instruction,
-            tools=tools
-        )
+
+# Caps concurrent Gemini calls so a burst of chats doesn't exhaust the quota
+# (or the default thread pool the blocking SDK calls run in)
+gemini_semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+
+# Task tools callable by the model, by function name
+TOOL_MAP: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "add_task": add_task,
+    "list_tasks": list_tasks,
+    "complete_task": complete_task,
+    "delete_task": delete_task,
+    "update_task": update_task
+}
+
+# Read-only tools whose results can be reused within a chat turn
+CACHEABLE_TOOLS = frozenset({"list_tasks"})
+
+# Tool schemas are converted to protos once, so the model (built once per
+# process and shared by every AIService instance) never re-marshals them
+GEMINI_TOOLS = [
+    genai.protos.Tool(
+        function_declarations=[
+            genai.protos.FunctionDeclaration(**declaration)
+            for declaration in get_tool_definitions()
+        ]
+    )
+]
+GEMINI_MODEL = genai.GenerativeModel(
+    'gemini-2.5-flash',
+    system_instruction=SYSTEM_INSTRUCTION,
+    tools=GEMINI_TOOLS
+)
+
+
+class AIService:
+    """Service for handling AI chat interactions with MCP tools using Google Gemini."""
+    
+    def __init__(self):
+        self.system_instruction = SYSTEM_INSTRUCTION
+        self.model = GEMINI_MODEL
     
-    def get_gemini_tools(self) -> List[Dict[str, Any]]:
+    def get_gemini_tools(self) -> List[Any]:
         """
         Get MCP tools formatted for Gemini function calling.
         
         Returns:
-            List of tool definitions in Gemini format
+            List of Gemini Tool protos (shared; do not mutate)
         """
-        return get_tool_definitions()
+        return GEMINI_TOOLS
+    
+    async def send_message(self, chat: Any, content: Any) -> Any:
+        """
+        Send a message in a Gemini chat without blocking the event loop.
+        
+        The SDK call is synchronous, so it runs in a worker thread. The
+        timeout is enforced by the SDK itself, so the thread (and its
+        semaphore permit) ends with the request.
+        
+        Args:
+            chat: Gemini chat session
+            content: Message text or function response content
+            
+        Returns:
+            Gemini response
+            
+        Raises:
+            google.api_core.exceptions.DeadlineExceeded: If Gemini doesn't
+                respond within GEMINI_TIMEOUT seconds
+        """
+        async with gemini_semaphore:
+            return await asyncio.to_thread(
+                chat.send_message,
+                content,
+                request_options={"timeout": settings.GEMINI_TIMEOUT}
+            )
     
-    async def execute_mcp_tool(self, tool_name: str, arguments: Dict[str, Any], user_id: str) -> Any:
+    async def execute_mcp_tool(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        user_id: str,
+        session: AsyncSession
+    ) -> Any:
         """
         Execute an MCP tool by name.
         
         Args:
             tool_name: Name of the tool to execute
             arguments: Arguments to pass to the tool
-            user_id: User ID to inject into tool arguments
+            user_id: User ID passed to the tool (not added to arguments)
+            session: Database session shared by the tool calls of a request
             
         Returns:
             Tool execution result
         """
-        tool_map = {
-            "add_task": add_task,
-            "list_tasks": list_tasks,
-            "complete_task": complete_task,
-            "delete_task": delete_task,
-            "update_task": update_task
-        }
-        
-        tool = tool_map.get(tool_name)
+        tool = TOOL_MAP.get(tool_name)
         if not tool:
             return {"error": True, "message": f"Unknown tool: {tool_name}"}
         
         try:
-            # Automatically inject user_id into arguments
-            arguments["user_id"] = user_id
-            result = await tool(**arguments)
-            logger.info(f"Executed {tool_name} with args {arguments}: {result}")
+            # Pass user_id separately so the caller's arguments (recorded in
+            # the tool call history) are left untouched
+            result = await tool(session, user_id=user_id, **arguments)
+            # End the tool's transaction (read-only tools leave it open) so
+            # the connection goes back to the pool before the next Gemini call
+            await session.commit()
+            logger.info("Executed %s with args %s: %s", tool_name, arguments, result)
             return result
         except Exception as e:
-            logger.error(f"Error executing {tool_name}: {e}")
+            logger.error("Error executing %s: %s", tool_name, e)
             return {"error": True, "message": str(e)}
     
     async def get_or_create_conversation(
         self, 
         user_id: str, 
+        session: AsyncSession,
         conversation_id: Optional[int] = None
     ) -> Conversation:
         """
@@ -110,105 +169,111 @@ When completing actions, confirm what was done.
         
         Args:
             user_id: User ID
+            session: Database session
             conversation_id: Optional existing conversation ID
             
         Returns:
             Conversation object
         """
-        with Session(engine) as session:
-            if conversation_id:
-                conversation = session.get(Conversation, conversation_id)
-                if conversation and conversation.user_id == user_id:
-                    return conversation
-                    
-            # Create new conversation
-            conversation = Conversation(user_id=user_id)
-            session.add(conversation)
-            session.commit()
-            session.refresh(conversation)
-            
-            logger.info(f"Created new conversation {conversation.id} for user {user_id}")
-            return conversation
+        if conversation_id:
+            conversation = await session.get(Conversation, conversation_id)
+            if conversation and conversation.user_id == user_id:
+                return conversation
+                
+        # Create new conversation (the session doesn't expire on commit,
+        # so the flushed id is still loaded afterwards)
+        conversation = Conversation(user_id=user_id)
+        session.add(conversation)
+        await session.commit()
+        
+        logger.info("Created new conversation %s for user %s", conversation.id, user_id)
+        return conversation
     
     async def get_conversation_history(
         self, 
         conversation_id: int, 
+        session: AsyncSession,
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """
-        Get conversation history formatted for Gemini.
+        Get the most recent conversation history formatted for Gemini.
         
         Args:
             conversation_id: Conversation ID
+            session: Database session
             limit: Maximum number of messages to retrieve
             
         Returns:
             List of message dictionaries for Gemini
         """
-        with Session(engine) as session:
-            query = (
-                select(Message)
-                .where(Message.conversation_id == conversation_id)
-                .order_by(Message.created_at.asc())
-                .limit(limit)
-            )
-            
-            messages = session.exec(query).all()
-            
-            # Format for Gemini chat
-            history = []
-            for msg in messages:
-                history.append({
-                    "role": "user" if msg.role == "user" else "model",
-                    "parts": [msg.content]
-                })
-            
-            return history
+        # Most recent `limit` messages, newest first (a backward range scan on
+        # ix_msg_conv_id), then reversed into chronological order
+        query = (
+            select(Message.role, Message.content)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.id.desc())
+            .limit(limit)
+        )
+        
+        messages = (await session.exec(query)).all()
+        
+        # Format for Gemini chat
+        history = []
+        for msg in reversed(messages):
+            history.append({
+                "role": "user" if msg.role == MESSAGE_ROLE_CODES[MessageRole.USER] else "model",
+                "parts": [msg.content]
+            })
+        
+        return history
     
-    async def save_message(
+    async def save_messages(
         self, 
         conversation_id: int, 
         user_id: str, 
-        role: str, 
-        content: str
-    ) -> Message:
+        messages: List[Tuple[str, str]],
+        session: AsyncSession
+    ) -> List[Message]:
         """
-        Save a message to the database.
+        Save messages and bump the conversation's updated_at in one commit.
         
         Args:
             conversation_id: Conversation ID
             user_id: User ID
-            role: Message role ('user' or 'assistant')
-            content: Message content
+            messages: (role, content) pairs in chronological order,
+                role being 'user' or 'assistant'
+            session: Database session
             
         Returns:
-            Created message object
+            Created message objects
         """
-        with Session(engine) as session:
-            message = Message(
+        records = [
+            Message(
                 conversation_id=conversation_id,
                 user_id=user_id,
-                role=role,
+                role=MESSAGE_ROLE_CODES[MessageRole(role)],
                 content=content
             )
-            
-            session.add(message)
-            
-            # Update conversation updated_at
-            conversation = session.get(Conversation, conversation_id)
-            if conversation:
-                conversation.updated_at = datetime.utcnow()
-                session.add(conversation)
-            
-            session.commit()
-            session.refresh(message)
-            
-            return message
+            for role, content in messages
+        ]
+        session.add_all(records)
+        
+        # Update conversation updated_at without loading it
+        await session.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(updated_at=datetime.utcnow())
+        )
+        
+        await session.commit()
+        
+        return records
     
     async def chat(
         self, 
         user_id: str, 
         message: str, 
+        session: AsyncSession,
         conversation_id: Optional[int] = None
     ) -> Tuple[int, str, List[Dict[str, Any]]]:
         """
@@ -217,6 +282,7 @@ When completing actions, confirm what was done.
         Args:
             user_id: User ID
             message: User's message
+            session: Database session for the conversation and task tool calls
             conversation_id: Optional existing conversation ID
             
         Returns:
@@ -224,23 +290,36 @@ When completing actions, confirm what was done.
         """
         try:
             # Get or create conversation
-            conversation = await self.get_or_create_conversation(user_id, conversation_id)
+            conversation = await self.get_or_create_conversation(
+                user_id, session, conversation_id
+            )
+            # Keep the id as a plain int: a failed tool call rolls the session
+            # back, which expires the instance
+            conversation_id = conversation.id
             
-            # Save user message
-            await self.save_message(conversation.id, user_id, "user", message)
+            # Get conversation history (the current message is saved with the
+            # reply at the end of the turn, so it isn't part of it yet)
+            history = await self.get_conversation_history(conversation_id, session)
             
-            # Get conversation history
-            history = await self.get_conversation_history(conversation.id)
+            # Return the connection to the pool while Gemini runs; the session
+            # checks one out again only for tool calls and the final save
+            await session.commit()
             
-            # Create chat session with history (exclude current message from history)
-            chat = self.model.start_chat(history=history[:-1] if len(history) > 1 else [])
+            # Create chat session with history
+            chat = self.model.start_chat(history=history)
             
             # Send message to Gemini
-            response = chat.send_message(message)
+            response = await self.send_message(chat, message)
             
             tool_calls_record = []
             final_response = ""
             
+            # Results of this turn's list_tasks calls, so a listing the model
+            # repeats is answered without running it again. Only reads are
+            # cached (two identical add_task calls must add two tasks), and
+            # the cache is cleared after any call that changes tasks
+            call_cache: Dict[str, Any] = {}
+            
             # Handle function calls in a loop
             max_iterations = 5  # Prevent infinite loops
             iteration = 0
@@ -259,10 +338,21 @@ When completing actions, confirm what was done.
                     function_name = function_call.name
                     function_args = dict(function_call.args)
                     
-                    logger.info(f"Function call: {function_name} with args: {function_args}")
+                    logger.info("Function call: %s with args: %s", function_name, function_args)
                     
-                    # Execute the MCP tool (automatically injects user_id)
-                    result = await self.execute_mcp_tool(function_name, function_args, user_id)
+                    # Execute the MCP tool (user_id is passed separately)
+                    call_key = repr((function_name, sorted(function_args.items())))
+                    if call_key in call_cache:
+                        result = call_cache[call_key]
+                        logger.info("Reusing result of repeated call to %s", function_name)
+                    else:
+                        result = await self.execute_mcp_tool(
+                            function_name, function_args, user_id, session
+                        )
+                        if function_name in CACHEABLE_TOOLS:
+                            call_cache[call_key] = result
+                        else:
+                            call_cache.clear()
                     
                     # Record the tool call
                     tool_calls_record.append({
@@ -272,7 +362,8 @@ When completing actions, confirm what was done.
                     })
                     
                     # Send function response back to Gemini
-                    response = chat.send_message(
+                    response = await self.send_message(
+                        chat,
                         genai.protos.Content(
                             parts=[genai.protos.Part(
                                 function_response=genai.protos.FunctionResponse(
@@ -298,19 +389,24 @@ When completing actions, confirm what was done.
                 else:
                     final_response = "I'm ready to help you manage your tasks!"
             
-            # Save assistant response
-            await self.save_message(conversation.id, user_id, "assistant", final_response)
+            # Save the user message and assistant response together
+            await self.save_messages(
+                conversation_id,
+                user_id,
+                [("user", message), ("assistant", final_response)],
+                session
+            )
             
-            logger.info(f"Chat completed for user {user_id} in conversation {conversation.id}")
+            logger.info("Chat completed for user %s in conversation %s", user_id, conversation_id)
             
-            return conversation.id, final_response, tool_calls_record
+            return conversation_id, final_response, tool_calls_record
             
         except Exception as e:
-            logger.error(f"Error in chat: {e}", exc_info=True)
+            logger.error("Error in chat: %s", e, exc_info=True)
             # Return a friendly error message
             error_response = "I'm sorry, I encountered an error processing your request. Please try again."
             return (
-                conversation.id if 'conversation' in locals() else 0,
+                conversation_id if 'conversation' in locals() else 0,
                 error_response,
                 []
             )
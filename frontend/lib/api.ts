@@ -124,15 +124,30 @@ class ApiClient {
   // Task API methods
 
   /**
-   * Get all tasks for user
+   * Get all tasks for user, following the X-Next-Cursor pagination header
    */
   async getTasks(
     userId: string,
     status: TaskStatus = 'all',
     sort: TaskSort = 'created'
   ): Promise<Task[]> {
-    const params = new URLSearchParams({ status, sort })
-    return this.get<Task[]>(`/api/${userId}/tasks?${params}`)
+    const tasks: Task[] = []
+    let cursor: string | null = null
+
+    do {
+      const params = new URLSearchParams({ status, sort, limit: '100' })
+      if (cursor) {
+        params.set('cursor', cursor)
+      }
+      const response = await fetch(`${this.baseUrl}/api/${userId}/tasks?${params}`, {
+        method: 'GET',
+        headers: this.getHeaders(),
+      })
+      tasks.push(...(await this.handleResponse<Task[]>(response)))
+      cursor = response.headers.get('X-Next-Cursor')
+    } while (cursor)
+
+    return tasks
   }
 
   /**